@@ -9,16 +9,77 @@ DEFAULT_WEIGHTS = {
     "专家因子": 15       # DeepSeek 深度量化因子
 }
 
+# --- 全市场策略初始权重 ---
+ALLSTOCK_WEIGHTS = {"趋势": 30, "动能": 20, "成交": 15, "弹性": 15, "专家": 20}
+
 # --- 进化配置 ---
 EVOLUTION_LOOKBACK = 30  # 回测最近30次选股
 TARGET_HORIZON = 3       # 重点考核 T+3 的收益率 (实现波段进化)
 
+# --- 止盈止损参数 (可由 exit_sweep.py --apply 回写 EXIT_PARAMS_PATH 覆盖) ---
+EXIT_PARAMS = {
+    "entry_ratio": 0.99,       # 委托买入价 = max(现价 × entry_ratio, MA5)
+    "target_atr": 1.2,         # T+1 止盈 = 现价 + target_atr × ATR
+    "stop_atr": 0.8,           # 止损 = min(现价 - stop_atr × ATR, 当日最低 × stop_low_ratio)
+    "stop_low_ratio": 0.98,
+}
+
+# --- 资金与仓位 ---
+INITIAL_CASH = 100000.0     # 账户资金 (元)
+MAX_POSITION_RATIO = 0.8    # 总仓位上限
+MAX_SINGLE_RATIO = 0.25     # 单票仓位上限
+RISK_PER_TRADE = 0.01       # 单票打到止损最多亏损总资金的比例
+LOT_SIZE = 100              # A股一手 100 股
+
+# --- 运行调度：集合竞价前必须出结果 ---
+RUN_DEADLINE = "09:25"
+STAGE_BUDGETS = {           # 各阶段时间预算 (秒)
+    "market_analysis": 30,
+    "history_backfill": 60,
+    "weight_evolution": 40,
+    "scan": 420,
+    "expert_scoring": 180,  # 包含在 scan 内，逐股 LLM 打分累计耗时
+    "deep_decision": 45,
+}
+RUN_RESERVE = 15            # 排序/输出/落盘预留秒数
+SCAN_SECONDS_PER_CODE = 0.4 # 单只股票日线+因子的估算耗时，用于缩小股票池
+SCAN_MIN_CODES = 30         # 再紧张也至少扫描的个股数
+
+# --- 盘中模式 ---
+INTRADAY_PERIOD = "5"        # 分钟线周期：1 或 5
+INTRADAY_REFRESH = 180       # 排名刷新间隔 (秒)
+INTRADAY_OPENING_RANGE = 15  # 开盘区间：开盘后前 15 分钟
+INTRADAY_BASELINE_DAYS = 5   # 同时刻量比的基线天数
+INTRADAY_WORKERS = 8         # 分钟线并发拉取线程数
+
 LLM_CONFIG = {
     "api_url": "https://api.deepseek.com/chat/completions",
     "api_key": "", 
     "model_name": "deepseek-chat",
 }
 
+# --- Prompt 预算：每个调用点的 prompt token 上限 (本地估算) ---
+PROMPT_BUDGETS = {
+    "expert_factor": 300,      # 单股专家打分
+    "weight_evolution": 1500,  # 历史战报 -> 权重进化
+    "deep_decision": 2500,     # 精英池终极决策
+    "market_analysis": 600,    # 大盘环境 + 热点
+    "stock_diagnosis": 500,    # main.py 个股点评
+    "daily_report": 2000,      # 策略日报 (选股 + 本月表现 + 因子分档)
+    "period_report": 2000,     # 周报/月报
+    "default": 2000,
+}
+
 LOG_DIR = "strategy_log"
 HIST_PATH = os.path.join(LOG_DIR, "selection_history.csv")
+ALLSTOCK_HIST_PATH = os.path.join(LOG_DIR, "selection_history_allstock.csv")
+EXIT_PARAMS_PATH = os.path.join(LOG_DIR, "exit_params.json")
+DAILY_BAR_DIR = os.path.join(LOG_DIR, "bars")
+WEIGHTS_CACHE_PATH = os.path.join(LOG_DIR, "evolved_weights.json")
+RUN_LOG_PATH = os.path.join(LOG_DIR, "run_schedule_log.csv")
+SIGNALS_DIR = os.path.join(LOG_DIR, "signals")
+ROLLUP_DIR = os.path.join(LOG_DIR, "rollups")
+MINUTE_BAR_DIR = os.path.join(LOG_DIR, "minute")
+INTRADAY_DIR = os.path.join(LOG_DIR, "intraday")
+LLM_USAGE_PATH = os.path.join(LOG_DIR, "llm_usage_log.csv")
 if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
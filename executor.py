@@ -1,21 +1,24 @@
+import argparse
 import pandas as pd
 import json
 from datetime import datetime
 from config import *
+from portfolio import load_signals, signals_path
+
+def _fmt(col):
+    return col.map("{:.2f}".format)
 
 class TradingExecutor:
     """交易建议格式化输出工具"""
-    def __init__(self):
-        self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.signals_path = "strategy_log/trading_signals_log.csv"
+    def __init__(self, date=None):
+        self.current_date = date if date else datetime.now().strftime("%Y-%m-%d")
+        self.signals_path = signals_path(self.current_date)
 
     def load_latest_signals(self) -> pd.DataFrame:
-        """加载最新交易信号"""
-        if not pd.io.common.file_exists(self.signals_path):
-            raise FileNotFoundError("交易信号日志不存在，请先运行auto_strategy_optimizer.py")
-        
-        signals_df = pd.read_csv(self.signals_path)
-        latest_signals = signals_df[signals_df["日期"] == self.current_date]
+        """加载当日交易信号（按日期分区文件，直接读取）"""
+        latest_signals = load_signals(self.current_date)
+        if latest_signals is None:
+            raise FileNotFoundError(f"交易信号文件 {self.signals_path} 不存在，请先运行 strategy_engine.py")
         if latest_signals.empty:
             raise ValueError(f"无{self.current_date}的交易信号，请先运行策略主程序")
         
@@ -23,24 +26,26 @@ class TradingExecutor:
 
     def format_trading_advice(self) -> str:
         """格式化交易建议（适合实盘参考）"""
-        latest_signals = self.load_latest_signals()
+        df = self.load_latest_signals()
         advice = f"📊 A股短线交易建议（{self.current_date}）\n"
         advice += "="*60 + "\n"
         
-        total_invest = 0
-        for _, row in latest_signals.iterrows():
-            advice += f"\n【{row['股票名称']}（{row['股票代码']}）】\n"
-            advice += f"📌 核心数据：\n"
-            advice += f"   当前价格：{row['当前价格']:.2f}元\n"
-            advice += f"   支撑位：{row['支撑位']:.2f}元 | 阻力位：{row['阻力位']:.2f}元\n"
-            advice += f"   止损价：{row['止损价']:.2f}元 | 目标价：{row['目标价']:.2f}元\n"
-            advice += f"📌 操作建议：\n"
-            advice += f"   购买数量：{row['购买数量']}股\n"
-            advice += f"   投入资金：{row['投入资金']:.2f}元（持仓比例：{row['持仓比例']:.2f}%）\n"
-            advice += f"   买入区间：{row['支撑位']:.2f} - {row['当前价格']:.2f}元\n"
-            advice += f"   执行纪律：跌破止损价立即卖出，达到目标价分批止盈\n"
-            advice += "-"*50 + "\n"
-            total_invest += row['投入资金']
+        # 按列拼接，每只股票一段
+        blocks = (
+            "\n【" + df['股票名称'] + "（" + df['股票代码'] + "）】\n"
+            + "📌 核心数据：\n"
+            + "   当前价格：" + _fmt(df['当前价格']) + "元\n"
+            + "   支撑位：" + _fmt(df['支撑位']) + "元 | 阻力位：" + _fmt(df['阻力位']) + "元\n"
+            + "   止损价：" + _fmt(df['止损价']) + "元 | 目标价：" + _fmt(df['目标价']) + "元\n"
+            + "📌 操作建议：\n"
+            + "   购买数量：" + df['购买数量'].astype(str) + "股\n"
+            + "   投入资金：" + _fmt(df['投入资金']) + "元（持仓比例：" + _fmt(df['持仓比例']) + "%）\n"
+            + "   买入区间：" + _fmt(df['支撑位']) + " - " + _fmt(df['当前价格']) + "元\n"
+            + "   执行纪律：跌破止损价立即卖出，达到目标价分批止盈\n"
+            + "-"*50 + "\n"
+        )
+        advice += "".join(blocks)
+        total_invest = df['投入资金'].sum()
         
         # 资金汇总
         advice += f"\n💰 资金配置汇总：\n"
@@ -70,8 +75,11 @@ class TradingExecutor:
         print("\n" + advice)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='导出交易建议')
+    parser.add_argument('--date', type=str, help='信号日期 YYYY-MM-DD，默认今天')
+    args = parser.parse_args()
     try:
-        executor = TradingExecutor()
+        executor = TradingExecutor(args.date)
         executor.export_advice_to_file()
     except Exception as e:
         print(f"❌ 导出交易建议失败：{str(e)}")
\ No newline at end of file
@@ -0,0 +1,208 @@
+import argparse, functools, itertools, json, os
+import numpy as np
+import pandas as pd
+import akshare as ak
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from config import *
+
+# 参数网格：与 calculate_logic 的 EXIT_PARAMS 同名
+PARAM_GRID = {
+    "entry_ratio": [0.97, 0.98, 0.99, 1.0],
+    "target_atr": [0.8, 1.0, 1.2, 1.5, 2.0, 2.5, 3.0],
+    "stop_atr": [0.4, 0.6, 0.8, 1.0, 1.5],
+    "stop_low_ratio": [0.96, 0.98, 1.0],
+}
+SWEEP_RESULT_PATH = os.path.join(LOG_DIR, "exit_sweep_results.csv")
+HIST_PATHS = {"main_board": HIST_PATH, "allstock": ALLSTOCK_HIST_PATH}
+
+@functools.lru_cache(maxsize=1)
+def last_trading_day():
+    """最近一个已收盘的交易日 (新浪交易日历，取不到时按工作日推算)"""
+    now = datetime.now()
+    day = now.date() if now.strftime("%H:%M") >= "15:30" else now.date() - timedelta(days=1)
+    try:
+        cal = pd.to_datetime(ak.tool_trade_date_hist_sina()['trade_date']).dt.date
+        return str(cal[cal <= day].max())
+    except:
+        while day.weekday() >= 5: day -= timedelta(days=1)
+        return str(day)
+
+def _fetch_bars(code, start, end):
+    df = ak.stock_zh_a_hist(symbol=code, period="daily", start_date=start.replace('-', ''),
+                            end_date=end.replace('-', ''), adjust="qfq")
+    df['日期'] = df['日期'].astype(str)
+    return df
+
+def load_daily_bars(code, date, before=14, after=0):
+    """
+    日线本地缓存：每只股票一个文件 (strategy_log/bars/<code>.csv)，只增不减。
+    选股日 date 及之前不足 before 根、之后不足 after 根且缓存尚未到最近交易日时，才补拉缺的一段
+    """
+    os.makedirs(DAILY_BAR_DIR, exist_ok=True)
+    path = os.path.join(DAILY_BAR_DIR, f"{code}.csv")
+    cached = pd.read_csv(path, dtype={'日期': str}) if os.path.exists(path) else None
+    last_day = last_trading_day()
+    need_start = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=40)).strftime("%Y-%m-%d")
+
+    try:
+        if cached is None or cached.empty:
+            df = _fetch_bars(code, need_start, last_day)
+        elif (cached['日期'] <= date).sum() < before:
+            # 向前补历史：与缓存合并后整段重拉，保证前复权基准一致
+            df = _fetch_bars(code, min(need_start, cached['日期'].iloc[0]), last_day)
+        elif (cached['日期'] > date).sum() < after and cached['日期'].iloc[-1] < last_day:
+            # 向后补新 K 线：从缓存最后一天起拉，重叠那天用来校验复权基准
+            new = _fetch_bars(code, cached['日期'].iloc[-1], last_day)
+            overlap = cached.merge(new, on='日期', suffixes=('', '_new'))
+            if not overlap.empty and (overlap['收盘'] - overlap['收盘_new']).abs().max() > 0.005:
+                # 期间除权除息，旧缓存的前复权价格已失效
+                df = _fetch_bars(code, cached['日期'].iloc[0], last_day)
+            else:
+                df = pd.concat([cached, new], ignore_index=True).drop_duplicates('日期', keep='last')
+        else: return cached
+    except: return cached
+
+    if df is None or df.empty: return cached
+    df = df.sort_values('日期').reset_index(drop=True)
+    df.to_csv(path, index=False)
+    return df
+
+def build_paths(selections, horizon):
+    """
+    把每条历史选股整理成定长数组：
+    选股日的 price/ATR/MA5/当日最低，以及之后 horizon 根 K 线的 开/高/低/收 (不足补 NaN)
+    """
+    n = len(selections)
+    o, h, l, c = (np.full((n, horizon), np.nan) for _ in range(4))
+    price, atr, ma5, last_low = (np.full(n, np.nan) for _ in range(4))
+
+    for i, (_, row) in enumerate(selections.iterrows()):
+        bars = load_daily_bars(str(row['code']).zfill(6), row['date'], before=14, after=horizon)
+        if bars is None or bars.empty: continue
+        hist = bars[bars['日期'] <= row['date']]
+        future = bars[bars['日期'] > row['date']].head(horizon)
+        if len(hist) < 14 or future.empty: continue
+
+        # 与 calculate_logic 口径一致
+        price[i] = hist['收盘'].iloc[-1]
+        atr[i] = (hist['最高'] - hist['最低']).tail(14).mean()
+        ma5[i] = hist['收盘'].tail(5).mean()
+        last_low[i] = hist['最低'].iloc[-1]
+        k = len(future)
+        o[i, :k], h[i, :k], l[i, :k], c[i, :k] = (future[col].values for col in ('开盘', '最高', '最低', '收盘'))
+
+    keep = ~np.isnan(price)
+    return {"open": o[keep], "high": h[keep], "low": l[keep], "close": c[keep],
+            "price": price[keep], "atr": atr[keep], "ma5": ma5[keep], "last_low": last_low[keep]}
+
+def _first_hit(mask):
+    """沿最后一维找第一次为 True 的位置，没有则返回长度"""
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), mask.shape[-1])
+
+def simulate(paths, params):
+    """
+    对 P 组参数 × S 条选股路径一次性向量化模拟，返回每组参数的统计
+    - 第 1 根 K 线最低价触及委托买入价才成交，开盘低于委托价按开盘价成交
+    - A股 T+1：成交当天不能卖出，从第 2 根 K 线开始检查止损/止盈
+    - 同一根 K 线同时触及止损和止盈时按止损处理 (保守)；跳空按开盘价成交
+    - 到期未触发按最后一根有效 K 线收盘价离场
+    """
+    P = len(params)
+    er, ta, sa, slr = (np.array([p[k] for p in params])[:, None] for k in ("entry_ratio", "target_atr", "stop_atr", "stop_low_ratio"))
+    price, atr, ma5 = paths["price"][None, :], paths["atr"][None, :], paths["ma5"][None, :]
+    o, h, l, c = paths["open"], paths["high"], paths["low"], paths["close"]
+
+    entrust = np.maximum(price * er, ma5)                                  # (P, S)
+    filled = l[None, :, 0] <= entrust
+    entry = np.minimum(o[None, :, 0], entrust)
+    target = price + ta * atr
+    stop = np.minimum(price - sa * atr, paths["last_low"][None, :] * slr)
+
+    # 持有期 K 线 (剔除成交当天)
+    ho, hh, hl = o[None, :, 1:], h[None, :, 1:], l[None, :, 1:]
+    stop_idx = _first_hit(hl <= stop[..., None])                         # (P, S)
+    tgt_idx = _first_hit(hh >= target[..., None])
+    last_idx = np.maximum((~np.isnan(c[:, 1:])).sum(axis=1) - 1, 0)[None, :]
+    shape = (P,) + ho.shape[1:]
+
+    exit_idx = np.minimum(np.minimum(stop_idx, tgt_idx), last_idx)
+    open_at = np.take_along_axis(np.broadcast_to(ho, shape), exit_idx[..., None], axis=-1)[..., 0]
+    close_at = np.take_along_axis(np.broadcast_to(c[None, :, 1:], shape), exit_idx[..., None], axis=-1)[..., 0]
+    stop_first = (stop_idx <= tgt_idx) & (stop_idx <= last_idx)
+    tgt_first = (tgt_idx < stop_idx) & (tgt_idx <= last_idx)
+    exit_price = np.where(stop_first, np.minimum(stop, open_at),
+                          np.where(tgt_first, np.maximum(target, open_at), close_at))
+
+    has_hold = (~np.isnan(c[:, 1:])).any(axis=1)[None, :]
+    valid = filled & has_hold
+    ret = np.where(valid, (exit_price - entry) / entry * 100, np.nan)
+    hold = np.where(valid, exit_idx + 1, np.nan)
+
+    n = valid.sum(axis=1)
+    # 没有成交的参数组直接记 NaN (nanmean 对全空行会刷 RuntimeWarning)
+    per_trade = lambda x: np.where(n > 0, np.nansum(x, axis=1) / np.maximum(n, 1), np.nan)
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            **{k: [p[k] for p in params] for k in params[0]},
+            'trades': n,
+            'fill_rate': n / max(valid.shape[1], 1) * 100,
+            'expectancy': per_trade(ret),
+            'win_rate': np.where(n > 0, (ret > 0).sum(axis=1) / np.maximum(n, 1) * 100, np.nan),
+            'stop_rate': np.where(n > 0, (stop_first & valid).sum(axis=1) / np.maximum(n, 1) * 100, np.nan),
+            'target_rate': np.where(n > 0, (tgt_first & valid).sum(axis=1) / np.maximum(n, 1) * 100, np.nan),
+            'avg_hold': per_trade(hold),
+        })
+
+def sweep(paths, grid=None, workers=None):
+    """参数网格按块分给多进程，每块内部向量化"""
+    grid = grid if grid else PARAM_GRID
+    params = [dict(zip(grid, v)) for v in itertools.product(*grid.values())]
+    workers = workers or os.cpu_count() or 1
+    chunks = [params[i::workers] for i in range(workers) if params[i::workers]]
+    if len(chunks) == 1: return simulate(paths, chunks[0])
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        parts = list(pool.map(simulate, [paths] * len(chunks), chunks))
+    return pd.concat(parts, ignore_index=True)
+
+def load_selections(profile="all", lookback=None):
+    frames = []
+    for name, path in HIST_PATHS.items():
+        if profile not in ("all", name) or not os.path.exists(path): continue
+        try:
+            df = pd.read_csv(path, on_bad_lines='skip', dtype={'code': str})
+            if 'date' in df.columns: frames.append(df[['date', 'code']].dropna(subset=['date']))  # 旧版迁入记录无日期
+        except Exception as e: print(f"⚠️ 读取 {path} 失败: {e}")
+    if not frames: return pd.DataFrame(columns=['date', 'code'])
+    df = pd.concat(frames, ignore_index=True).drop_duplicates()
+    return df.tail(lookback) if lookback else df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='止盈止损参数网格回测')
+    parser.add_argument('--profile', type=str, default='all', help='main_board / allstock / all')
+    parser.add_argument('--horizon', type=int, default=TARGET_HORIZON + 2, help='成交当日 + 持有K线数')
+    parser.add_argument('--lookback', type=int, help='只用最近 N 条选股记录')
+    parser.add_argument('--min-trades', type=int, default=20, help='参与排名的最少成交笔数')
+    parser.add_argument('--workers', type=int, help='进程数，默认 CPU 核数')
+    parser.add_argument('--apply', action='store_true', help='把期望收益最高的参数写入 exit_params.json')
+    args = parser.parse_args()
+    if args.horizon < 2: parser.error("--horizon 至少为 2 (成交当日不能卖出)")
+
+    selections = load_selections(args.profile, args.lookback)
+    print(f"⏳ 正在整理 {len(selections)} 条历史选股的 K 线路径 (T+{args.horizon})...")
+    paths = build_paths(selections, args.horizon)
+    if len(paths["price"]) == 0:
+        print("⚠️ 没有可用于回测的历史选股")
+        raise SystemExit(1)
+
+    result = sweep(paths, workers=args.workers).sort_values('expectancy', ascending=False)
+    result.to_csv(SWEEP_RESULT_PATH, index=False)
+    print(f"✅ {len(result)} 组参数 × {len(paths['price'])} 条路径回测完成：{SWEEP_RESULT_PATH}")
+
+    ranked = result[result['trades'] >= args.min_trades]
+    print(ranked.head(10).round(2).to_string(index=False))
+    if args.apply and not ranked.empty:
+        best = {k: float(ranked.iloc[0][k]) for k in PARAM_GRID}
+        with open(EXIT_PARAMS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(best, f, ensure_ascii=False, indent=2)
+        print(f"📌 已写入 {EXIT_PARAMS_PATH}: {best}，calculate_logic 下次运行生效")
@@ -1,64 +1,118 @@
+import argparse
 import pandas as pd
 import json
 from datetime import datetime, timedelta
 from typing import Dict
 from llm_client import FreeLLMClient
+from prompt_builder import compact_table, fill_table
+from rollups import PerformanceRollup, summarize, period_keys
 from config import *
 import os
 
 class StrategyReportGenerator:
-    def __init__(self):
+    def __init__(self, date=None):
         self.llm_client = FreeLLMClient()
-        self.current_date = datetime.now().strftime("%Y-%m-%d")
-    
-    def load_log_data(self) -> Dict:
-        """加载日志数据"""
-        data = {
-            "stock_selection": pd.DataFrame(),
-            "param_optimization": pd.DataFrame(),
-            "trading_signals": pd.DataFrame(),
-            "factor_weights": {} # 默认为空
+        self.rollup = PerformanceRollup()
+        self.current_date = date if date else datetime.now().strftime("%Y-%m-%d")
+
+    def load_log_data(self, kind="monthly") -> Dict:
+        """加载预先汇总好的数据：当日选股、所属周期业绩及该周期的因子分档表现（只读固定几个小文件）"""
+        period = period_keys(self.current_date)[kind]
+        agg = self.rollup.load_period(kind, period)
+        return {
+            "daily": self.rollup.load_daily(self.current_date),
+            "period_key": period,
+            "period": agg,
+            "factor_buckets": (agg or {}).get("factor_buckets", {}),
         }
-        # 加载各路日志文件
-        if os.path.exists("strategy_log/stock_selection_log.csv"):
-            data["stock_selection"] = pd.read_csv("strategy_log/stock_selection_log.csv")
-        if os.path.exists("strategy_log/trading_signals_log.csv"):
-            data["trading_signals"] = pd.read_csv("strategy_log/trading_signals_log.csv")
-        return data
-    
+
+    def _performance_table(self, horizons) -> str:
+        """{策略: {周期: 累加量}} -> 紧凑表格"""
+        rows = [{'策略': profile, '周期': h, **summarize(stats)}
+                for profile, by_h in (horizons or {}).items() for h, stats in sorted(by_h.items())]
+        for r in rows:
+            r['最佳'] = f"{r['最佳'][0]}{r['最佳'][1]:+.1f}%" if r['最佳'] else "-"
+            r['最差'] = f"{r['最差'][0]}{r['最差'][1]:+.1f}%" if r['最差'] else "-"
+        return compact_table(rows, ['策略', '周期', '笔数', '平均收益%', '胜率%', '最佳', '最差'], digits=1) if rows else "暂无已回填的收益数据"
+
+    def _fill_factor_table(self, template, site, buckets, horizon=f"T+{TARGET_HORIZON}") -> str:
+        """各因子分档在考核周期上的平均收益填入模板，额度为 site 预算扣除模板其余部分，样本少的分档优先省略"""
+        rows = [{'策略': profile, '因子': factor, '分档': bucket, **summarize(by_h[horizon])}
+                for profile, factors in buckets.items() for factor, by_bucket in factors.items()
+                for bucket, by_h in by_bucket.items() if horizon in by_h]
+        return fill_table(template, site, rows, ['策略', '因子', '分档', '笔数', '平均收益%', '胜率%'],
+                          system=self.llm_client.expert_persona, priority=lambda r: r['笔数'], digits=1,
+                          empty="暂无因子分档数据")
+
     def generate_daily_report(self) -> None:
         """生成每日策略报告（LLM增强）"""
         print(f"\n📄 正在生成{self.current_date}每日报告...")
-        data = self.load_log_data()
-        
-        daily_stocks = data["stock_selection"] # 简化逻辑：假设当前加载的就是最新选股
-        
-        if daily_stocks.empty:
-            print(f"⚠️  无交易数据，无法生成每日报告")
+        data = self.load_log_data("monthly")
+        daily = data["daily"]
+
+        if not daily or not daily.get("picks"):
+            print(f"⚠️  无{self.current_date}选股数据，无法生成每日报告")
             return
-        
-        # 提取选股展示字符串
-        top_stocks_str = "\n".join([f"- {row['股票名称']}（{row['代码']}）" for _, row in daily_stocks.head(10).iterrows()])
-        
-        # LLM提示词
-        prompt = f"""
+
+        # 提取当日选股展示字符串
+        picks = [{'策略': profile, **p} for profile, ps in daily["picks"].items() for p in ps]
+        top_stocks_str = compact_table(picks, ['策略', 'code', 'name', 'final_score', 'price', 'entrust_buy', 'stop_loss', 'target'])
+
+        # LLM提示词：选股和本月表现全量保留，因子分档表用剩余预算
+        prompt = self._fill_factor_table(f"""
         作为专业的A股分析师，生成{self.current_date}策略日报：
-        1. 今日精选个股：{top_stocks_str}
-        2. 选股逻辑：基于全市场1000只活跃股扫描，锁定综合评分前10。
-        3. 操作核心：严格执行买入和止损参考价位。
-        """
-        
-        # 修改点：确保调用接口名称一致
-        daily_report = self.llm_client._call_llm(prompt)
-        
+        1. 今日精选个股：
+        {top_stocks_str}
+        2. 本月({data['period_key']})历史选股实际表现：
+        {self._performance_table(data['period']['horizons'] if data['period'] else None)}
+        3. 本月因子分档表现 (T+{TARGET_HORIZON})：
+        {{table}}
+        4. 操作核心：严格执行买入和止损参考价位，并结合近期实际胜率评价今日选股的可信度。
+        """, "daily_report", data['factor_buckets'])
+
+        daily_report = self.llm_client._call_llm(prompt, site="daily_report")
+
         # 保存报告
         report_path = f"strategy_log/daily_report_{self.current_date}.md"
         with open(report_path, "w", encoding="utf-8") as f:
             f.write(f"# A股策略日报（{self.current_date}）\n\n")
             f.write(daily_report if daily_report else "报告生成失败")
-        
+
         print(f"✅ 每日报告已保存：{report_path}")
 
+    def generate_period_report(self, kind="weekly") -> None:
+        """生成周报/月报：直接读取对应周期的汇总表"""
+        data = self.load_log_data(kind)
+        label = "周报" if kind == "weekly" else "月报"
+        print(f"\n📄 正在生成{data['period_key']}策略{label}...")
+        if not data["period"]:
+            print(f"⚠️  {data['period_key']} 暂无已回填的收益数据，无法生成{label}")
+            return
+
+        prompt = self._fill_factor_table(f"""
+        作为专业的A股分析师，生成{data['period_key']}策略{label}：
+        1. 覆盖选股日：{len(data['period']['dates'])} 天
+        2. 各策略分周期表现：
+        {self._performance_table(data['period']['horizons'])}
+        3. 本期因子分档表现 (T+{TARGET_HORIZON})：
+        {{table}}
+        4. 请总结哪些策略/因子有效、哪些失效，并给出下一阶段的权重调整建议。
+        """, "period_report", data['factor_buckets'])
+        report = self.llm_client._call_llm(prompt, site="period_report")
+
+        report_path = f"strategy_log/{kind}_report_{data['period_key']}.md"
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(f"# A股策略{label}（{data['period_key']}）\n\n")
+            f.write(report if report else "报告生成失败")
+
+        print(f"✅ {label}已保存：{report_path}")
+
 if __name__ == "__main__":
-    generator = StrategyReportGenerator()
-    generator.generate_daily_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='策略报告生成')
+    parser.add_argument('--mode', type=str, default='daily', choices=['daily', 'weekly', 'monthly'])
+    parser.add_argument('--date', type=str, help='报告日期 YYYY-MM-DD，默认今天')
+    args = parser.parse_args()
+
+    generator = StrategyReportGenerator(args.date)
+    if args.mode == 'daily': generator.generate_daily_report()
+    else: generator.generate_period_report(args.mode)
@@ -0,0 +1,245 @@
+import argparse, copy, json, os, time
+import numpy as np
+import pandas as pd
+import akshare as ak
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import *
+from trading_signal import TradingSignalGenerator
+from strategy_engine import MAIN_BOARD_PROFILE, load_cached_weights, main_board_universe
+from portfolio import load_signals
+
+# 分钟线按列存储：每列一个定长二进制文件，只追加
+COLUMNS = {"code": np.int32, "minute": np.int16, "open": np.float32, "high": np.float32,
+           "low": np.float32, "close": np.float32, "volume": np.float64, "amount": np.float64}
+SESSION_MINUTES = 241  # 09:30 集合竞价 + 240 个交易分钟
+
+def session_minute(ts):
+    """时间戳 -> 交易分钟序号 (09:30=0, 11:30=120, 13:01=121, 15:00=240)"""
+    t = ts.dt.hour * 60 + ts.dt.minute
+    return np.where(t <= 690, t - 570, t - 780 + 120).astype(np.int16)
+
+
+class MinuteBarStore:
+    """
+    按交易日分目录的列式分钟线库：strategy_log/minute/<日期>_<周期>m/<列名>.bin
+    每只股票记录已写入的最后一分钟 (watermark.json)，重复拉取只追加新的已收盘 K 线
+    """
+    def __init__(self, root=MINUTE_BAR_DIR, period=INTRADAY_PERIOD):
+        self.root = root
+        self.period = str(period)
+
+    def _dir(self, date):
+        return os.path.join(self.root, f"{date}_{self.period}m")
+
+    def _watermark(self, date):
+        try:
+            with open(os.path.join(self._dir(date), "watermark.json"), encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _rows(self, day_dir):
+        """各列文件完整写入的行数：写到一半崩溃时各列长度不一，取最短的"""
+        return min(os.path.getsize(os.path.join(day_dir, f"{col}.bin")) // np.dtype(dtype).itemsize
+                   if os.path.exists(os.path.join(day_dir, f"{col}.bin")) else 0 for col, dtype in COLUMNS.items())
+
+    def append(self, date, bars):
+        """bars: 含 COLUMNS 各列的 DataFrame (可多只股票)，只写入晚于 watermark 的部分"""
+        if bars.empty: return 0
+        day_dir = self._dir(date)
+        os.makedirs(day_dir, exist_ok=True)
+        # 上次追加中途崩溃：各列截断到相同行数再追加，否则之后的行全部错位
+        # (watermark 最后写入、未前移，截掉的 K 线下次会重新追加)
+        rows = self._rows(day_dir)
+        for col, dtype in COLUMNS.items():
+            path = os.path.join(day_dir, f"{col}.bin")
+            if os.path.exists(path) and os.path.getsize(path) > rows * np.dtype(dtype).itemsize:
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+        mark = self._watermark(date)
+        last = bars['code'].map(lambda c: mark.get(str(c), -1))
+        bars = bars[bars['minute'] > last].sort_values(['code', 'minute'])
+        if bars.empty: return 0
+
+        for col, dtype in COLUMNS.items():
+            with open(os.path.join(day_dir, f"{col}.bin"), 'ab') as f:
+                bars[col].to_numpy(dtype).tofile(f)
+        mark.update({str(c): int(m) for c, m in bars.groupby('code')['minute'].max().items()})
+        with open(os.path.join(day_dir, "watermark.json"), 'w', encoding='utf-8') as f: json.dump(mark, f)
+        return len(bars)
+
+    def days(self):
+        if not os.path.exists(self.root): return []
+        suffix = f"_{self.period}m"
+        return sorted(d[:-len(suffix)] for d in os.listdir(self.root) if d.endswith(suffix))
+
+    def load(self, date):
+        """读取一天的全部列，返回 {列名: ndarray}，只读各列都完整的行"""
+        day_dir = self._dir(date)
+        if not os.path.exists(os.path.join(day_dir, "code.bin")): return None
+        rows = self._rows(day_dir)
+        return {col: np.fromfile(os.path.join(day_dir, f"{col}.bin"), dtype=dtype, count=rows) for col, dtype in COLUMNS.items()}
+
+    def matrix(self, date, codes, fields=("open", "high", "low", "close", "volume", "amount")):
+        """一天的数据展开成 {字段: (股票数, SESSION_MINUTES)} 矩阵，缺失为 NaN"""
+        cols = self.load(date)
+        out = {f: np.full((len(codes), SESSION_MINUTES), np.nan) for f in fields}
+        if cols is None: return out
+        codes = np.asarray(codes, dtype=np.int32)
+        order = np.argsort(codes)
+        pos = np.minimum(np.searchsorted(codes[order], cols["code"]), len(codes) - 1)
+        keep = codes[order][pos] == cols["code"]
+        row = order[pos[keep]]
+        for f in fields: out[f][row, cols["minute"][keep]] = cols[f][keep]
+        return out
+
+
+def fetch_minute_bars(code, period=INTRADAY_PERIOD, days=0):
+    """东财分钟线 (1分钟只有最近5个交易日)，整理成 store 的列格式"""
+    # days=0 只拉当天 (盘中刷新)，否则按自然日放宽一倍覆盖 days 个交易日
+    start = (datetime.now() - timedelta(days=days * 2)).strftime("%Y-%m-%d 09:00:00")
+    end = datetime.now().strftime("%Y-%m-%d 15:30:00")
+    try:
+        df = ak.stock_zh_a_hist_min_em(symbol=code, start_date=start, end_date=end, period=str(period), adjust="")
+    except: return None
+    if df is None or df.empty: return None
+    ts = pd.to_datetime(df['时间'])
+    # 盘中最后一根 K 线尚未收盘，写入后 watermark 会越过它、之后不再更新，留到下次刷新再追加
+    if ts.iloc[-1].date() == datetime.now().date() and datetime.now().strftime("%H:%M") < "15:00":
+        df, ts = df.iloc[:-1], ts.iloc[:-1]
+        if df.empty: return None
+    return pd.DataFrame({
+        "date": ts.dt.strftime("%Y-%m-%d"), "code": int(code), "minute": session_minute(ts),
+        "open": df['开盘'], "high": df['最高'], "low": df['最低'], "close": df['收盘'],
+        "volume": df['成交量'], "amount": df['成交额'],
+    })
+
+
+class IntradayRanker:
+    """
+    盘中模式：候选股日线因子开盘前算一次，盘中每隔几分钟只拉增量分钟线，
+    用分钟级变体替换 量价爆发 / 资金流向 两个因子后重新排序
+    """
+    def __init__(self, codes=None, period=INTRADAY_PERIOD):
+        self.store = MinuteBarStore(period=period)
+        self.period = str(period)
+        self.date = datetime.now().strftime("%Y-%m-%d")
+        self.profile = copy.copy(MAIN_BOARD_PROFILE)  # 不改动模块级策略对象
+        self.profile.weights = load_cached_weights(self.profile)
+
+        spot = ak.stock_zh_a_spot_em()
+        self.codes = codes if codes else self.default_codes(spot)
+        spot = spot.set_index('代码')
+        self.names = spot['名称'].reindex(self.codes).fillna("").to_numpy()
+        self.prev_close = spot['昨收'].reindex(self.codes).to_numpy(float)
+
+        print(f"⏳ 正在准备 {len(self.codes)} 只候选股的日线因子与分钟线基线...")
+        self.base = self.daily_factors()
+        self.ingest(INTRADAY_BASELINE_DAYS)
+        self.baseline = self.volume_baseline()
+
+    def default_codes(self, spot):
+        """优先用今日信号文件里的股票，没有则取主板股票池"""
+        signals = load_signals(self.date)
+        if signals is not None and not signals.empty: return signals['股票代码'].tolist()
+        return main_board_universe(spot)['代码'].tolist()
+
+    def daily_factors(self):
+        """日线口径的 趋势强度/基本面安全垫 只在启动时算一次"""
+        rows = []
+        for code in self.codes:
+            tsg = TradingSignalGenerator(code)
+            tsg.fetch_stock_data()
+            rows.append(tsg.get_indicators() or {})
+        return pd.DataFrame(rows, index=self.codes)
+
+    def ingest(self, days=0):
+        """并发拉取分钟线，按日期追加到列式库；days>0 时连同前几日一起补齐"""
+        with ThreadPoolExecutor(max_workers=INTRADAY_WORKERS) as pool:
+            frames = [f for f in pool.map(lambda c: fetch_minute_bars(c, self.period, days), self.codes) if f is not None]
+        if not frames: return 0
+        bars = pd.concat(frames, ignore_index=True)
+        return sum(self.store.append(date, day.drop(columns='date')) for date, day in bars.groupby('date'))
+
+    def volume_baseline(self):
+        """前 N 个交易日同一时刻的平均累计成交量 (股票数, SESSION_MINUTES)"""
+        int_codes = [int(c) for c in self.codes]
+        days = [d for d in self.store.days() if d < self.date][-INTRADAY_BASELINE_DAYS:]
+        if not days: return None
+        vols = np.stack([self.store.matrix(d, int_codes, ("volume",))["volume"] for d in days])  # (天数, 股票数, 分钟)
+        # 某只股票某天没有任何 K 线 (停牌/未拉到) 不计入均值，否则会被当成 0 成交拉低基线
+        has = ~np.isnan(vols).all(axis=2, keepdims=True)
+        n = has.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, np.where(has, np.nancumsum(vols, axis=2), 0).sum(axis=0) / n, np.nan)
+
+    @np.errstate(invalid='ignore', divide='ignore')
+    def factors(self):
+        """全部候选股的分钟级因子，按 (股票数, 分钟) 矩阵向量化计算"""
+        m = self.store.matrix(self.date, [int(c) for c in self.codes])
+        seen = ~np.isnan(m["close"])
+        if not seen.any(): return None
+
+        # 最新价：每只股票最后一根有效 K 线
+        last_idx = np.where(seen.any(axis=1), SESSION_MINUTES - 1 - np.argmax(seen[:, ::-1], axis=1), 0)
+        last = m["close"][np.arange(len(self.codes)), last_idx]
+        day_high, day_low = np.nanmax(m["high"], axis=1), np.nanmin(m["low"], axis=1)
+
+        # 1. VWAP 偏离 (成交量单位为手)
+        cum_vol = np.nansum(m["volume"], axis=1)
+        vwap = np.nansum(m["amount"], axis=1) / (cum_vol * LOT_SIZE)
+        vwap_dev = (last / vwap - 1) * 100
+
+        # 2. 开盘区间突破
+        or_high = np.nanmax(m["high"][:, :INTRADAY_OPENING_RANGE + 1], axis=1)
+        orb = (last / or_high - 1) * 100
+
+        # 3. 同时刻量比：按每只股票自己的最后一根 K 线对齐基线 (拉取失败/停牌的股票不会对到更晚的时刻)
+        vol_ratio = cum_vol / self.baseline[np.arange(len(self.codes)), last_idx] if self.baseline is not None else np.full(len(self.codes), np.nan)
+
+        # 与日线 量价爆发 / 资金流向 同口径打分
+        chg = (last / self.prev_close - 1) * 100
+        f1 = np.where(chg > 9.7, 10, 40 + np.where(chg > 5, 50, 0)
+                      + np.where((vol_ratio > 1.5) & (vol_ratio < 4), 30, 0) + np.where(orb > 0, 20, 0))
+        strength = (last - day_low) / (day_high - day_low + 0.01)
+        f3 = strength * 50 + np.clip(50 + np.nan_to_num(vwap_dev) * 10, 0, 100) * 0.5
+
+        return pd.DataFrame({
+            '代码': self.codes, '名称': self.names, '最新价': np.round(last, 2), '涨跌幅': np.round(chg, 2),
+            'VWAP偏离%': np.round(vwap_dev, 2), '开盘区间突破%': np.round(orb, 2), '同时刻量比': np.round(vol_ratio, 2),
+            '量价爆发': np.round(f1, 1), '资金流向': np.round(f3, 1),
+        }).assign(**{k: self.base[k].to_numpy() for k in ('趋势强度', '基本面安全垫') if k in self.base})
+
+    def refresh(self):
+        start = time.time()
+        added = self.ingest()
+        df = self.factors()
+        if df is None:
+            print("⚠️ 今日暂无分钟线数据")
+            return None
+        weights = self.profile.weights
+        df['盘中得分'] = sum(df[k].fillna(0) * float(w) / 100 for k, w in weights.items() if k in df)
+        df = df.sort_values('盘中得分', ascending=False)
+
+        os.makedirs(INTRADAY_DIR, exist_ok=True)
+        df.to_csv(os.path.join(INTRADAY_DIR, f"rank_{self.date}.csv"), index=False)
+        cost = time.time() - start
+        print(f"\n⏱️ {datetime.now().strftime('%H:%M:%S')} 盘中刷新：新增 {added} 根K线，耗时 {cost:.1f}s")
+        if cost > INTRADAY_REFRESH * 0.5: print(f"⚠️ 刷新耗时超过刷新间隔的一半 ({INTRADAY_REFRESH}s)，建议缩小候选池")
+        print(df.head(10).to_string(index=False))
+        return df
+
+    def run(self, once=False):
+        while True:
+            self.refresh()
+            if once or datetime.now().strftime("%H:%M") >= "15:00": break
+            time.sleep(INTRADAY_REFRESH)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='盘中分钟级因子排名')
+    parser.add_argument('--codes', type=str, help='逗号分隔的股票代码，默认今日信号/主板股票池')
+    parser.add_argument('--period', type=str, default=INTRADAY_PERIOD, choices=['1', '5'], help='分钟线周期')
+    parser.add_argument('--once', action='store_true', help='只刷新一次')
+    args = parser.parse_args()
+
+    codes = [c.strip().zfill(6) for c in args.codes.split(",")] if args.codes else None
+    IntradayRanker(codes, args.period).run(args.once)
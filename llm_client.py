@@ -1,27 +1,60 @@
-import requests, json, re
+import requests, json, re, os, csv, time
 import akshare as ak
 import pandas as pd
-from config import LLM_CONFIG
+from datetime import datetime
+from config import LLM_CONFIG, LLM_USAGE_PATH
+from prompt_builder import estimate_tokens, compact_record, get_budget, fill_table, strip_indent, EXPERT_FIELDS
+
+# 大盘分析失败/被跳过时的默认热点与建议
+FALLBACK_SECTORS = ["科技", "新能源", "大消费"]
+
+def fallback_market(reason):
+    return list(FALLBACK_SECTORS), f"震荡整理 | 建议半仓 | {reason}，启动安全模式"
 
 class FreeLLMClient:
     def __init__(self):
         self.api_url = LLM_CONFIG["api_url"]
         self.api_key = LLM_CONFIG["api_key"]
         self.model_name = LLM_CONFIG["model_name"]
+        self.timeout = 60 # 调度器会按剩余预算收紧
         self.expert_persona = "您是精通A股短线博弈的量化基金经理，擅长通过盘面细节捕捉市场情绪。"
 
-    def _call_llm(self, prompt, system=None):
+    def _call_llm(self, prompt, system=None, site="default"):
+        """site: 调用点名称，用于 token 统计与预算"""
         system_msg = system if system else self.expert_persona
+        prompt = strip_indent(prompt)
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         payload = {
             "model": self.model_name,
             "messages": [{"role": "system", "content": system_msg}, {"role": "user", "content": prompt}],
             "temperature": 0.5 # 稍微提高温度，增加分析的灵活性
         }
+        budget = get_budget(site)
+        est = estimate_tokens(system_msg) + estimate_tokens(prompt)
+        if est > budget: print(f"⚠️ [{site}] prompt 约 {est} tokens，超出预算 {budget}")
+        start = time.time()
+        content, usage = None, {}
         try:
-            res = requests.post(self.api_url, headers=headers, json=payload, timeout=60)
-            return res.json()['choices'][0]['message']['content']
-        except: return None
+            res = requests.post(self.api_url, headers=headers, json=payload, timeout=self.timeout)
+            body = res.json()
+            content = body['choices'][0]['message']['content']
+            usage = body.get('usage') or {}
+        except: pass
+        # source: api=接口返回的用量, estimate=成功但无 usage 按本地估算, failed=请求失败/超时 (无输出)
+        source = 'api' if usage else ('estimate' if content is not None else 'failed')
+        self._log_usage(site, usage.get('prompt_tokens', est),
+                        usage.get('completion_tokens', estimate_tokens(content)), source, time.time() - start)
+        return content
+
+    def _log_usage(self, site, prompt_tokens, completion_tokens, source, latency):
+        """按调用点记录 prompt/completion token 数"""
+        try:
+            file_exists = os.path.exists(LLM_USAGE_PATH)
+            with open(LLM_USAGE_PATH, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if not file_exists: writer.writerow(['time', 'site', 'prompt_tokens', 'completion_tokens', 'source', 'latency'])
+                writer.writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), site, prompt_tokens, completion_tokens, source, round(latency, 2)])
+        except OSError: pass
 
     def fetch_market_analysis(self):
         """
@@ -75,7 +108,7 @@ class FreeLLMClient:
             关键词1,关键词2,关键词3 ### 建议：进攻/防守 | 仓位：X成 | 理由：一句话简述逻辑
             """
             
-            res = self._call_llm(prompt)
+            res = self._call_llm(prompt, site="market_analysis")
             if res and "###" in res:
                 parts = res.split("###")
                 sectors = [k.strip() for k in parts[0].split(",") if k.strip()]
@@ -86,13 +119,14 @@ class FreeLLMClient:
                 
         except Exception as e:
             print(f"⚠️ 大盘分析降级: {e}")
-            sectors = ["科技", "新能源", "大消费"]
-            status = "震荡整理 | 建议半仓 | 数据源异常，启动安全模式"
+            sectors, status = fallback_market("数据源异常")
             
         return sectors, status
 
     def get_ai_expert_factor(self, stock_info):
-        """专家打分 (保持不变)"""
+        """专家打分：stock_info 可以是行情行 (Series/dict) 或已编码字符串"""
+        if not isinstance(stock_info, str) or stock_info.lstrip().startswith("{"):
+            stock_info = compact_record(stock_info, EXPERT_FIELDS)
         prompt = f"""对以下个股进行波段潜力诊断。
         【目标】寻找不仅明日能冲高，且具备3-5天上涨持续性的个股。
         【要求】
@@ -100,26 +134,47 @@ class FreeLLMClient:
         2. 优先选择底部放量、突破关键压力位的主升浪初期标的。
         数据：{stock_info}
         返回JSON: {{"score": 85, "reason": "xxx", "alpha": 10}}"""
-        res = self._call_llm(prompt)
+        res = self._call_llm(prompt, site="expert_factor")
         try:
             match = re.search(r'\{.*\}', res, re.DOTALL)
             data = json.loads(match.group())
             return data.get("score", 60), data.get("reason", "形态良好"), data.get("alpha", 0)
         except: return 60, "量化趋势稳健", 0
 
-    def optimize_weights_deep_evolution(self, history_data, current_weights, market_context):
-        """保持不变"""
-        prompt = f"""
+    def optimize_weights_deep_evolution(self, history_rows, columns, current_weights, market_context, priority=None):
+        """
+        history_rows: 历史战报行，按 weight_evolution 预算扣除模板后压缩成表格
+        LLM 失败或无法解析时返回 None
+        """
+        prompt = fill_table(f"""
         【任务】基于历史战绩进行Transformer自注意力权重优化。
         【今日市场环境】{market_context}
         【历史多周期战报】
-        {history_data if history_data else "暂无足够T+3数据，请根据市场预判。"}
-        【当前权重】{json.dumps(current_weights)}
+        {{table}}
+        【当前权重】{json.dumps(current_weights, ensure_ascii=False)}
         【输出】
-        只返回JSON，总和100：{{"量价爆发": 40, "趋势强度": 15, ...}}
-        """
-        res = self._call_llm(prompt)
+        只返回JSON，键必须与当前权重一致，总和100：{json.dumps({k: "x" for k in current_weights}, ensure_ascii=False)}
+        """, "weight_evolution", history_rows, columns, system=self.expert_persona, priority=priority, digits=1,
+            empty="暂无足够T+3数据，请根据市场预判。")
+        res = self._call_llm(prompt, site="weight_evolution")
+        try:
+            match = re.search(r'\{.*\}', res, re.DOTALL)
+            new_weights = json.loads(match.group())
+            # 只接受当前策略已有的因子，缺失的沿用原值
+            return {k: float(new_weights.get(k, v)) for k, v in current_weights.items()}
+        except: return None
+
+    def ai_deep_decision(self, market_context, elite_rows, columns, top_n=10, priority=None):
+        """精英池终极决策：elite_rows 按 deep_decision 预算扣除模板后压缩；返回 {代码: 理由}，按推荐顺序排列"""
+        prompt = fill_table(f"""
+        【今日市场审美】{market_context}
+        【精英备选池】
+        {{table}}
+        【任务】从备选池中挑选最多{top_n}只短线波段最优标的，按推荐优先级排序。
+        【输出】只返回JSON：{{"代码": "一句话理由", ...}}
+        """, "deep_decision", elite_rows, columns, system=self.expert_persona, priority=priority, digits=1)
+        res = self._call_llm(prompt, site="deep_decision")
         try:
             match = re.search(r'\{.*\}', res, re.DOTALL)
-            return json.loads(match.group())
-        except: return current_weights
\ No newline at end of file
+            return {str(k).strip(): str(v) for k, v in json.loads(match.group()).items()}
+        except: return {}
\ No newline at end of file
@@ -19,7 +19,7 @@ def analyze_single_stock(stock_code: str, cost_price=None):
     tsg.fetch_stock_data()
     
     # 2. 获取计算逻辑
-    res = tsg.calculate_logic(cost_price)
+    res = tsg.calculate_logic()
     
     if not res or tsg.stock_data is None:
         print(f"❌ 无法获取股票 {stock_code} 的数据，请检查网络或代码。")
@@ -96,7 +96,7 @@ def analyze_single_stock(stock_code: str, cost_price=None):
     2. 【操作策略】：针对激进型（追涨）和稳健型（回调买）投资者的不同建议。
     """
     
-    analysis = llm._call_llm(diagnose_prompt)
+    analysis = llm._call_llm(diagnose_prompt, site="stock_diagnosis")
     if analysis:
         print(analysis)
     else:
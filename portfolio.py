@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from config import *
+
+SIGNAL_COLUMNS = ['日期', '策略', '排名', '股票代码', '股票名称', '当前价格', '委托买入价', '支撑位', '阻力位',
+                  '止损价', '目标价', 'ATR', '综合得分', '购买数量', '投入资金', '持仓比例', '止损风险']
+
+def signals_path(date):
+    """交易信号按日期分文件：strategy_log/signals/signals_YYYY-MM-DD.csv"""
+    return os.path.join(SIGNALS_DIR, f"signals_{date}.csv")
+
+def size_positions(df, cash=INITIAL_CASH, risk_per_trade=RISK_PER_TRADE,
+                   max_single=MAX_SINGLE_RATIO, max_total=MAX_POSITION_RATIO):
+    """
+    向量化仓位计算，输入需含 code/entrust_buy/stop_loss/atr 列（按排名排序）
+    1. 单票风险：跌到止损价最多亏 cash × risk_per_trade
+    2. 单票上限：不超过 cash × max_single
+    3. 总仓位：合计超过 cash × max_total 时按比例整体缩减
+    最后按 100 股一手向下取整，科创板 (688) 不足 200 股不买
+    """
+    entry = df['entrust_buy'].to_numpy(float)
+    # 止损距离过小 (或止损价不低于买入价) 时，用半个 ATR 兜底，避免仓位被放大
+    risk = np.maximum(entry - df['stop_loss'].to_numpy(float), df['atr'].to_numpy(float) * 0.5)
+    risk = np.where(risk > 0, risk, entry * 0.02)
+
+    shares = np.minimum(cash * risk_per_trade / risk, cash * max_single / entry)
+    total = (shares * entry).sum()
+    if total > cash * max_total: shares = shares * (cash * max_total / total)
+
+    lots = np.floor(shares / LOT_SIZE) * LOT_SIZE
+    min_lot = np.where(df['code'].astype(str).str.startswith('688'), 2 * LOT_SIZE, LOT_SIZE)
+    lots = np.where(lots >= min_lot, lots, 0).astype(int)
+
+    out = df.copy()
+    out['shares'] = lots
+    out['invest'] = np.round(lots * entry, 2)
+    out['weight_pct'] = np.round(out['invest'] / cash * 100, 2)
+    out['risk_amount'] = np.round(lots * risk, 2)
+    return out
+
+# 信号文件列 -> 排序结果字段，用于把同日已有信号与本次结果合并后重新分配仓位
+_SIGNAL_FIELDS = {'策略': 'profile', '排名': 'rank', '股票代码': 'code', '股票名称': 'name', '当前价格': 'price',
+                  '委托买入价': 'entrust_buy', '支撑位': 'support', '阻力位': 'resistance', '止损价': 'stop_loss',
+                  '目标价': 'target', 'ATR': 'atr', '综合得分': 'final_score'}
+
+def build_signals(results, date=None, cash=INITIAL_CASH, order=None):
+    """
+    多策略排序结果 -> 当日交易信号，写入按日期分区的信号文件 (无信号也写出表头)
+    - 同日已有信号文件时按策略合并：本次运行的策略整体替换，其余策略的信号保留
+    - 同一只股票只保留 order (策略注册顺序) 靠前的那一条，统一在同一份资金下重新计算仓位
+    """
+    date = date if date else datetime.now().strftime("%Y-%m-%d")
+    rows = [{**s, 'profile': name, 'rank': i + 1} for name, ranked in results.items() for i, s in enumerate(ranked)]
+    existing = load_signals(date)
+    if existing is not None and not existing.empty:
+        kept = existing[~existing['策略'].isin(list(results))]
+        rows += kept[list(_SIGNAL_FIELDS)].rename(columns=_SIGNAL_FIELDS).to_dict('records')
+
+    df = pd.DataFrame(rows) if rows else pd.DataFrame(columns=list(_SIGNAL_FIELDS.values()))
+    if not df.empty:
+        order = list(order or [])
+        order += [p for p in df['profile'].unique() if p not in order]
+        df['_order'] = df['profile'].map(order.index)
+        df = df.sort_values(['_order', 'rank'], kind='stable').drop_duplicates(subset='code').reset_index(drop=True)
+        df = size_positions(df, cash=cash)
+        df = df[df['shares'] > 0]
+    else: df = df.assign(shares=[], invest=[], weight_pct=[], risk_amount=[])
+
+    signals = pd.DataFrame({
+        '日期': date, '策略': df['profile'], '排名': df['rank'], '股票代码': df['code'].astype(str).str.zfill(6),
+        '股票名称': df['name'], '当前价格': df['price'], '委托买入价': df['entrust_buy'],
+        '支撑位': df.get('support', df['entrust_buy']), '阻力位': df.get('resistance', df['target']),
+        '止损价': df['stop_loss'], '目标价': df['target'], 'ATR': df['atr'], '综合得分': df['final_score'],
+        '购买数量': df['shares'], '投入资金': df['invest'], '持仓比例': df['weight_pct'], '止损风险': df['risk_amount'],
+    }, columns=SIGNAL_COLUMNS)
+
+    os.makedirs(SIGNALS_DIR, exist_ok=True)
+    signals.to_csv(signals_path(date), index=False)
+    print(f"💼 仓位分配完成：{len(signals)} 只，合计投入 {signals['投入资金'].sum():.2f} 元 -> {signals_path(date)}")
+    return signals
+
+def load_signals(date):
+    """直接读取当日分区文件"""
+    path = signals_path(date)
+    if not os.path.exists(path): return None
+    return pd.read_csv(path, dtype={'股票代码': str})
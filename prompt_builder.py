@@ -0,0 +1,94 @@
+import math, re, json, numbers
+import pandas as pd
+from config import PROMPT_BUDGETS
+
+# DeepSeek 官方估算口径：1个中文字符≈0.6 token，1个英文/数字字符≈0.3 token
+_CJK_RE = re.compile(r'[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]')
+
+# 专家打分只需要的盘口字段（原先整行 to_json 有二十多个字段）
+EXPERT_FIELDS = ['代码', '名称', '最新价', '涨跌幅', '振幅', '量比', '换手率', '成交额', '市盈率-动态', '流通市值', '60日涨跌幅']
+
+def estimate_tokens(text) -> int:
+    """本地估算 token 数，不依赖分词器"""
+    if not text: return 0
+    text = str(text)
+    cjk = len(_CJK_RE.findall(text))
+    return math.ceil(cjk * 0.6 + (len(text) - cjk) * 0.3)
+
+def get_budget(site: str) -> int:
+    return PROMPT_BUDGETS.get(site, PROMPT_BUDGETS["default"])
+
+def strip_indent(prompt: str) -> str:
+    """去掉三引号模板每行的缩进和空行，缩进空格同样计 token"""
+    return "\n".join(line.strip() for line in str(prompt).splitlines() if line.strip())
+
+def fill_table(template, site, rows, columns, system="", priority=None, digits=2, empty="暂无数据", placeholder="{table}"):
+    """
+    把表格填进模板的 {table} 处：表格额度 = site 预算 - 模板其余部分与 system 的实测 token，
+    超出时由 compact_table 按 priority 丢行汇总
+    """
+    overhead = estimate_tokens(strip_indent(template.replace(placeholder, ""))) + estimate_tokens(system)
+    rows = list(rows.to_dict('records') if isinstance(rows, pd.DataFrame) else rows)
+    table = compact_table(rows, columns, budget=max(get_budget(site) - overhead, 0),
+                          priority=priority, digits=digits) if rows else empty
+    return template.replace(placeholder, table)
+
+def compact_value(v, digits=2):
+    """数字取整，大额数字换算成 亿/万，空值输出 '-'"""
+    if v is None: return "-"
+    if isinstance(v, str): return v
+    try:
+        if pd.isna(v): return "-"
+    except (TypeError, ValueError): pass
+    if isinstance(v, numbers.Number):
+        if abs(v) >= 1e8: return f"{v / 1e8:.{digits}f}亿"
+        if abs(v) >= 1e4: return f"{v / 1e4:.{digits}f}万"
+        v = round(float(v), digits)
+        return str(int(v)) if v == int(v) else str(v)
+    return str(v)
+
+def compact_record(record, fields=None, digits=2) -> str:
+    """单条记录压缩成 k=v;k=v，只保留相关字段"""
+    if isinstance(record, pd.Series): record = record.to_dict()
+    elif isinstance(record, str):
+        try: record = json.loads(record)
+        except ValueError: return record
+    keys = [k for k in (fields or record.keys()) if k in record]
+    return ";".join(f"{k}={compact_value(record[k], digits)}" for k in keys)
+
+def compact_table(rows, columns, budget=None, priority=None, digits=2) -> str:
+    """
+    多行数据压缩成竖线分隔表格，超出 budget 时按 priority 从低到高丢弃，
+    被丢弃的行汇总成一行（条数 + 数值列均值），保持原有行序
+    """
+    if isinstance(rows, pd.DataFrame): rows = rows.to_dict('records')
+    rows = list(rows)
+    header = "|".join(columns)
+    lines = ["|".join(compact_value(r.get(c), digits) for c in columns) for r in rows]
+    if budget is None or estimate_tokens(header + "\n" + "\n".join(lines)) <= budget:
+        return "\n".join([header] + lines)
+
+    # 默认越靠后（越新）优先级越高
+    prio = [priority(r) if priority else i for i, r in enumerate(rows)]
+    order = sorted(range(len(rows)), key=lambda i: prio[i], reverse=True)
+    # 表头 + 预留汇总行的额度（汇总行长度与表头同量级）
+    used = estimate_tokens(header) * 2 + 10
+    kept = set()
+    for i in order:
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > budget: break
+        kept.add(i)
+        used += cost
+
+    out = [header] + [lines[i] for i in range(len(rows)) if i in kept]
+    dropped = [rows[i] for i in range(len(rows)) if i not in kept]
+    if dropped: out.append(_summarize(dropped, columns, digits))
+    return "\n".join(out)
+
+def _summarize(rows, columns, digits=2) -> str:
+    df = pd.DataFrame(rows)
+    parts = []
+    for c in columns:
+        if c in df.columns and pd.api.types.is_numeric_dtype(df[c]):
+            parts.append(f"{c}均值={compact_value(df[c].mean(), digits)}")
+    return f"...另有{len(rows)}条省略" + (f"（{','.join(parts)}）" if parts else "")
@@ -0,0 +1,157 @@
+import argparse, json, os, shutil
+import pandas as pd
+from datetime import datetime
+from config import *
+
+# 历史记录中的回填列 -> 考核周期
+HORIZON_COLUMNS = {"next_day_price": "T+1", "price_t3": "T+3", "price_t5": "T+5"}
+# 最高档不设上限：量价爆发最高 140，全市场的 动能/成交/弹性 也没有上限
+FACTOR_BUCKETS = [(0, 20), (20, 40), (40, 60), (60, 80), (80, None)]
+
+def _read(path, default):
+    try:
+        with open(path, encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return default
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def _add(stats, name, ret):
+    """累加一条收益：笔数、收益和、盈利笔数、最佳/最差"""
+    stats['n'] = stats.get('n', 0) + 1
+    stats['sum_ret'] = round(stats.get('sum_ret', 0.0) + ret, 4)
+    stats['hits'] = stats.get('hits', 0) + (1 if ret > 0 else 0)
+    if 'best' not in stats or ret > stats['best'][1]: stats['best'] = [name, round(ret, 2)]
+    if 'worst' not in stats or ret < stats['worst'][1]: stats['worst'] = [name, round(ret, 2)]
+    return stats
+
+def summarize(stats):
+    """累加量 -> 均值/胜率"""
+    n = stats.get('n', 0)
+    return {'笔数': n, '平均收益%': round(stats['sum_ret'] / n, 2) if n else None,
+            '胜率%': round(stats['hits'] / n * 100, 1) if n else None,
+            '最佳': stats.get('best'), '最差': stats.get('worst')}
+
+def period_keys(date):
+    d = datetime.strptime(date, "%Y-%m-%d")
+    year, week, _ = d.isocalendar()
+    return {"weekly": f"{year}-W{week:02d}", "monthly": d.strftime("%Y-%m")}
+
+def factor_bucket(value):
+    for lo, hi in FACTOR_BUCKETS:
+        if hi is None and value >= lo: return f"{lo}+"
+        if hi is not None and lo <= value < hi: return f"{lo}-{hi}"
+    return None
+
+def _add_buckets(buckets, profile, factors, horizon, name, ret):
+    """一条收益按各因子取值计入 {策略: {因子: {分档: {周期: 累加量}}}}"""
+    for factor, value in (factors or {}).items():
+        try: bucket = factor_bucket(float(value))
+        except (TypeError, ValueError): continue
+        if bucket is None: continue
+        _add(buckets.setdefault(profile, {}).setdefault(factor, {}).setdefault(bucket, {}).setdefault(horizon, {}), name, ret)
+
+
+class PerformanceRollup:
+    """
+    物化的业绩汇总表，随选股和回填增量更新，读取时只打开对应的一个小文件：
+    - daily/<日期>.json     当日选股 + 该批选股在各周期的收益统计
+    - weekly/<年-W周>.json  / monthly/<年-月>.json  按选股日期归入的周期统计 (含该周期的因子分档)
+    - factor_buckets.json  各策略每个因子分档在各周期的累计收益统计
+    """
+    def __init__(self, root=ROLLUP_DIR):
+        self.root = root
+
+    def _path(self, kind, key):
+        return os.path.join(self.root, kind, f"{key}.json")
+
+    # --- 写入 ---
+    def record_selection(self, profile, date, picks):
+        path = self._path("daily", date)
+        daily = _read(path, {"date": date, "picks": {}, "horizons": {}, "seen": []})
+        daily["picks"][profile] = [
+            {k: s.get(k) for k in ('code', 'name', 'final_score', 'price', 'entrust_buy', 'stop_loss', 'target', 'ai_reason')}
+            for s in picks]
+        _write(path, daily)
+
+    def record_outcome(self, profile, date, code, name, horizon, ret, factors=None):
+        """单条回填结果计入日/周/月/因子分档；同一 (策略, 股票, 周期) 只计一次"""
+        path = self._path("daily", date)
+        daily = _read(path, {"date": date, "picks": {}, "horizons": {}, "seen": []})
+        key = f"{profile}|{code}|{horizon}"
+        if key in daily["seen"]: return
+        daily["seen"].append(key)
+        _add(daily["horizons"].setdefault(profile, {}).setdefault(horizon, {}), name, ret)
+        _write(path, daily)
+
+        for kind, period in period_keys(date).items():
+            p_path = self._path(kind, period)
+            agg = _read(p_path, {"period": period, "dates": [], "horizons": {}, "factor_buckets": {}})
+            if date not in agg["dates"]: agg["dates"].append(date)
+            _add(agg["horizons"].setdefault(profile, {}).setdefault(horizon, {}), name, ret)
+            _add_buckets(agg.setdefault("factor_buckets", {}), profile, factors, horizon, name, ret)
+            _write(p_path, agg)
+
+        if factors:
+            f_path = os.path.join(self.root, "factor_buckets.json")
+            buckets = _read(f_path, {})
+            _add_buckets(buckets, profile, factors, horizon, name, ret)
+            _write(f_path, buckets)
+
+    # --- 读取 ---
+    def load_daily(self, date):
+        return _read(self._path("daily", date), None)
+
+    def load_period(self, kind, key):
+        return _read(self._path(kind, key), None)
+
+    def load_factor_buckets(self):
+        return _read(os.path.join(self.root, "factor_buckets.json"), {})
+
+    # --- 初始化 ---
+    def rebuild(self, profiles):
+        """
+        从各策略历史记录全量重建收益统计（仅首次迁移或修复时使用）
+        已有 daily 文件里的 picks (含评分/委托价/止损/AI理由) 无法从历史记录还原，原样保留
+        """
+        daily_dir = os.path.join(self.root, "daily")
+        kept = {}
+        if os.path.exists(daily_dir):
+            for fn in os.listdir(daily_dir):
+                if fn.endswith(".json"):
+                    picks = _read(os.path.join(daily_dir, fn), {}).get("picks")
+                    if picks: kept[fn[:-len(".json")]] = picks
+        if os.path.exists(self.root): shutil.rmtree(self.root)
+        for date, picks in kept.items():
+            _write(self._path("daily", date), {"date": date, "picks": picks, "horizons": {}, "seen": []})
+
+        for p in profiles:
+            if not os.path.exists(p.hist_path): continue
+            try: df = pd.read_csv(p.hist_path, on_bad_lines='skip', dtype={'code': str})
+            except Exception as e:
+                print(f"⚠️ [{p.name}] 读取历史失败: {e}")
+                continue
+            if 'date' not in df.columns: continue
+            for date, day in df.groupby('date'):
+                # 历史记录只有选股时收盘价 (buy_price)，没有委托价，entrust_buy 留空；已有的 picks 不覆盖
+                if p.name not in kept.get(date, {}):
+                    self.record_selection(p.name, date, day.rename(columns={'buy_price': 'price'}).to_dict('records'))
+                for _, row in day.iterrows():
+                    for col, horizon in HORIZON_COLUMNS.items():
+                        if row.get(col, 0) > 0 and row['buy_price'] > 0:
+                            ret = (row[col] - row['buy_price']) / row['buy_price'] * 100
+                            self.record_outcome(p.name, date, str(row['code']).zfill(6), row['name'], horizon, ret,
+                                                {k: row.get(k) for k in p.factors})
+        print(f"✅ 业绩汇总表已重建：{self.root}")
+
+
+if __name__ == "__main__":
+    from strategy_engine import PROFILES
+    parser = argparse.ArgumentParser(description='业绩汇总表维护')
+    parser.add_argument('--rebuild', action='store_true', help='从历史记录全量重建')
+    args = parser.parse_args()
+    if args.rebuild: PerformanceRollup().rebuild(PROFILES)
@@ -0,0 +1,162 @@
+import argparse, csv, os, time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from config import *
+from strategy_engine import MultiStrategyEngine, PROFILES, load_cached_weights
+from portfolio import build_signals
+
+# 顺序执行的阶段；expert_scoring 嵌在 scan 里，单独计时
+STAGE_ORDER = ["market_analysis", "history_backfill", "weight_evolution", "scan", "deep_decision"]
+
+
+class RunScheduler:
+    """
+    截止时间驱动的运行调度：
+    - 每个阶段有独立时间预算，同时为后续阶段预留预算，越靠前的可选阶段越先让路
+    - 超预算时逐级降级：默认热点 -> 缓存/默认权重 -> 跳过低排名个股的 LLM 打分 -> 缩小股票池
+    - 无论降级到哪一步，截止前都输出排序结果，并记录降级明细
+    """
+    def __init__(self, engine=None, deadline=None, budgets=None, reserve=RUN_RESERVE):
+        self.engine = engine if engine else MultiStrategyEngine()
+        self.engine.guard = self
+        self.budgets = {**STAGE_BUDGETS, **(budgets or {})}
+        self.reserve = reserve
+        self.deadline = deadline if deadline else self.default_deadline()
+        self.used = {k: 0.0 for k in self.budgets}
+        self.started = {}
+        self.finished = set()
+        self.degradations = []
+        self.scan_count = 0
+
+    def default_deadline(self):
+        """今天 RUN_DEADLINE；已经过了则按全部预算之和往后推"""
+        h, m = map(int, RUN_DEADLINE.split(":"))
+        deadline = datetime.now().replace(hour=h, minute=m, second=0, microsecond=0)
+        if deadline <= datetime.now():
+            total = sum(self.budgets[s] for s in STAGE_ORDER) + self.reserve
+            deadline = datetime.now() + timedelta(seconds=total)
+            print(f"⏰ 已过 {RUN_DEADLINE}，本次截止时间按总预算顺延至 {deadline.strftime('%H:%M:%S')}")
+        return deadline
+
+    # --- 计时 ---
+    def remaining(self):
+        return (self.deadline - datetime.now()).total_seconds()
+
+    def elapsed(self, stage):
+        running = time.time() - self.started[stage] if stage in self.started and stage not in self.finished else 0
+        return self.used.get(stage, 0) + running
+
+    def time_left(self, stage):
+        """阶段剩余时间 = min(自身预算余量, 距截止时间 - 预留 - 尚未开始阶段的预算)"""
+        if stage == "expert_scoring":
+            return min(self.budgets[stage] - self.elapsed(stage), self.time_left("scan"))
+        # 终极决策可降级为按评分排序，扫描阶段不为它预留
+        later = sum(self.budgets[s] for s in STAGE_ORDER[STAGE_ORDER.index(stage) + 1:]
+                    if s not in self.started and not (stage == "scan" and s == "deep_decision"))
+        return min(self.budgets[stage] - self.elapsed(stage), self.remaining() - self.reserve - later)
+
+    def charge(self, stage, seconds):
+        self.used[stage] = self.used.get(stage, 0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        self.started[name] = time.time()
+        try: yield
+        finally:
+            self.used[name] += time.time() - self.started[name]
+            self.finished.add(name)
+
+    # --- 降级 ---
+    def allow(self, stage, action, need=0.5):
+        """剩余时间够 need 秒则放行，并把 LLM 超时收紧到剩余时间；否则记录降级"""
+        if stage == "scan":
+            # 保底扫描 SCAN_MIN_CODES 只，保证截止前一定有排序结果
+            self.scan_count += 1
+            if self.scan_count <= SCAN_MIN_CODES: return True
+        left = self.time_left(stage)
+        if left >= need:
+            self.engine.llm.timeout = max(1, min(60, left))
+            return True
+        self.degrade(stage, action)
+        return False
+
+    def degrade(self, stage, action):
+        if any(d['stage'] == stage and d['action'] == action for d in self.degradations): return
+        self.degradations.append({'stage': stage, 'action': action, 'time': datetime.now().strftime("%H:%M:%S")})
+        print(f"⏱️ [{stage}] 超出时间预算 -> {action}")
+
+    def shrink_universe(self, universe):
+        """按剩余扫描时间估算能处理的个股数，超出则截掉股票池尾部"""
+        capacity = max(int(max(self.time_left("scan"), 0) / SCAN_SECONDS_PER_CODE), SCAN_MIN_CODES)
+        if len(universe) > capacity:
+            self.degrade("scan", f"股票池由 {len(universe)} 只缩小至 {capacity} 只")
+            return universe.head(capacity)
+        return universe
+
+    # --- 主流程 ---
+    def run(self):
+        e = self.engine
+        print(f"\n🚀 [AI 多策略选股引擎 · 限时模式] 启动：{datetime.now().strftime('%H:%M:%S')} | 截止：{self.deadline.strftime('%H:%M:%S')}")
+
+        with self.stage("market_analysis"):
+            e.analyze_market(use_llm=self.allow("market_analysis", "跳过大盘 LLM 分析，使用默认热点", need=5))
+        print(f"📡 大盘操作建议: {e.market_status} | 核心热点: {e.hot_sectors}")
+
+        with self.stage("history_backfill"):
+            for p in e.profiles:
+                if not self.allow("history_backfill", "跳过历史回填"): break
+                e.update_historical_prices(p, should_stop=lambda: not self.allow("history_backfill", "历史回填中止，剩余记录下次补齐"))
+
+        with self.stage("weight_evolution"):
+            for p in e.profiles:
+                if self.allow("weight_evolution", f"[{p.name}] 使用缓存/默认权重", need=5):
+                    e.evolve_weights(p)
+                else:
+                    p.weights = load_cached_weights(p)
+                print(f"⚖️  [{p.name}] 权重: {p.weights}")
+
+        with self.stage("scan"):
+            candidates = e.scan()
+
+        results = {}
+        with self.stage("deep_decision"):
+            for p in e.profiles:
+                ranked = p.ranker(e, p, candidates[p.name])
+                e.report(p, ranked)
+                e.log_history(p, ranked)
+                results[p.name] = ranked
+        build_signals(results, order=[p.name for p in PROFILES])
+
+        self.log_run()
+        return results, self.degradations
+
+    def log_run(self):
+        """每个阶段一行：耗时、预算、降级动作"""
+        file_exists = os.path.exists(RUN_LOG_PATH)
+        with open(RUN_LOG_PATH, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if not file_exists: writer.writerow(['date', 'deadline', 'stage', 'used', 'budget', 'degradations'])
+            for stage, budget in self.budgets.items():
+                actions = "；".join(d['action'] for d in self.degradations if d['stage'] == stage)
+                writer.writerow([datetime.now().strftime("%Y-%m-%d"), self.deadline.strftime("%H:%M:%S"),
+                                 stage, round(self.used[stage], 1), budget, actions])
+
+        left = self.remaining()
+        print(f"\n⏰ 运行结束，距截止 {left:.0f} 秒" + ("" if left >= 0 else " (已超时)"))
+        if self.degradations:
+            print("📉 本次降级：" + " | ".join(f"[{d['stage']}] {d['action']}" for d in self.degradations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='限时选股调度')
+    parser.add_argument('--deadline', type=str, help=f'截止时间 HH:MM，默认 {RUN_DEADLINE}')
+    parser.add_argument('--budget', type=int, help='总时长 (秒)，从现在起算，优先于 --deadline')
+    args = parser.parse_args()
+
+    deadline = None
+    if args.budget:
+        deadline = datetime.now() + timedelta(seconds=args.budget)
+    elif args.deadline:
+        h, m = map(int, args.deadline.split(":"))
+        deadline = datetime.now().replace(hour=h, minute=m, second=0, microsecond=0)
+    RunScheduler(deadline=deadline).run()
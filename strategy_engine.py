@@ -0,0 +1,414 @@
+import pandas as pd
+import akshare as ak
+import os, warnings, csv, json, time
+from datetime import datetime
+from config import *
+from trading_signal import TradingSignalGenerator
+from llm_client import FreeLLMClient, fallback_market
+from portfolio import build_signals
+from rollups import PerformanceRollup, HORIZON_COLUMNS
+
+warnings.filterwarnings('ignore')
+
+HIST_BASE_FIELDS = ['date', 'code', 'name', 'buy_price', 'next_day_price', 'price_t3', 'price_t5']
+
+
+class StrategyProfile:
+    """
+    一套选股策略的完整描述：股票池过滤、因子集合、权重、排序方式、历史落盘位置
+    universe: spot_df -> 过滤排序后的 DataFrame
+    ranker:   (engine, profile, candidates) -> 排好序的候选列表
+    expert_key: 需要逐股调用 LLM 专家打分时的因子名，None 表示不逐股打分
+    """
+    def __init__(self, name, title, universe, factors, weights, hist_path, ranker,
+                 expert_key=None, max_candidates=None, top_n=10):
+        self.name = name
+        self.title = title
+        self.universe = universe
+        self.factors = factors
+        self.default_weights = dict(weights)
+        self.weights = dict(weights)
+        self.hist_path = hist_path
+        self.ranker = ranker
+        self.expert_key = expert_key
+        self.max_candidates = max_candidates
+        self.top_n = top_n
+
+    def score(self, factors):
+        return sum(factors.get(k, 0) * float(w) / 100 for k, w in self.weights.items())
+
+
+# --- 股票池 ---
+def main_board_universe(pool):
+    """深A主板：涨幅 2%~9.5%，成交额过亿，剔除ST"""
+    return pool[
+        (pool['代码'].str.startswith('00')) &
+        (pool['涨跌幅'] < 9.5) &
+        (pool['涨跌幅'] > 2.0) &  # 剔除织布机
+        (~pool['名称'].str.contains('ST')) &
+        (pool['成交额'] > 100000000)
+    ].sort_values(by='涨跌幅', ascending=False).head(100)
+
+def allstock_universe(pool):
+    """全市场成交额前 1000 (含主板/创业/科创)"""
+    pool = pool[~pool['名称'].str.contains('ST|退')]
+    return pool.sort_values(by='成交额', ascending=False).head(1000)
+
+
+# --- 排序方式 ---
+def rank_by_score(engine, profile, candidates):
+    return sorted(candidates, key=lambda x: x['final_score'], reverse=True)[:profile.top_n]
+
+def rank_by_llm_decision(engine, profile, candidates, elite_size=300):
+    """先按评分取精英池，再由 DeepSeek 终极决策；LLM 无结果时退回评分排序"""
+    elite_pool = sorted(candidates, key=lambda x: x['final_score'], reverse=True)[:elite_size]
+    if engine.guard and not engine.guard.allow("deep_decision", "跳过 DeepSeek 终极决策，按评分排序", need=5):
+        return elite_pool[:profile.top_n]
+    elite_rows = [{'代码': c['code'], '名称': c['name'], '评分': c['final_score'], '位阶%': c.get('position_pct')} for c in elite_pool[:100]]
+    print(f"🧠 DeepSeek 正在从 {len(elite_pool)} 只精英股中进行最终决策...")
+    # 超出 deep_decision 预算时优先保留高分股
+    decisions = engine.llm.ai_deep_decision(f"{engine.hot_sectors} - {engine.market_status}", elite_rows,
+                                            ['代码', '名称', '评分', '位阶%'], profile.top_n, priority=lambda r: r['评分'])
+
+    ranked = []
+    for code, reason in decisions.items():
+        match = next((x for x in elite_pool if str(x['code']) in str(code)), None)
+        if match and match not in ranked:
+            match['ai_reason'] = reason
+            ranked.append(match)
+        if len(ranked) >= profile.top_n: break
+    return ranked if ranked else elite_pool[:profile.top_n]
+
+
+MAIN_BOARD_PROFILE = StrategyProfile(
+    "main_board", "深A主板进攻 TOP 10 (波段潜力)", main_board_universe,
+    factors=list(DEFAULT_WEIGHTS), weights=DEFAULT_WEIGHTS, hist_path=HIST_PATH,
+    ranker=rank_by_score, expert_key="专家因子", max_candidates=15)
+
+ALLSTOCK_PROFILE = StrategyProfile(
+    "allstock", "今日选股 10 强决策 (1000选300选10)", allstock_universe,
+    factors=["趋势", "动能", "成交", "弹性", "专家"], weights=ALLSTOCK_WEIGHTS, hist_path=ALLSTOCK_HIST_PATH,
+    ranker=rank_by_llm_decision)
+
+PROFILES = [MAIN_BOARD_PROFILE, ALLSTOCK_PROFILE]
+
+
+def load_cached_weights(profile):
+    """上次成功进化的权重，没有则用初始权重"""
+    try:
+        with open(WEIGHTS_CACHE_PATH, encoding='utf-8') as f:
+            cached = json.load(f).get(profile.name)
+        if cached: return {k: float(cached.get(k, v)) for k, v in profile.default_weights.items()}
+    except (OSError, ValueError): pass
+    return dict(profile.default_weights)
+
+def save_cached_weights(profile):
+    try:
+        with open(WEIGHTS_CACHE_PATH, encoding='utf-8') as f: cache = json.load(f)
+    except (OSError, ValueError): cache = {}
+    cache[profile.name] = profile.weights
+    with open(WEIGHTS_CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+def migrate_legacy_history(src=HIST_PATH, dst=ALLSTOCK_HIST_PATH):
+    """
+    旧版全市场策略把选股写在 selection_history.csv (code,name,score,price，无日期，可能无表头或表头重复)，
+    该文件现为主板策略历史。检测到旧格式时一次性把记录迁入全市场历史，原文件改名留底；
+    迁移失败只提示，不影响引擎启动
+    """
+    if not os.path.exists(src): return
+    try:
+        with open(src, encoding='utf-8') as f: header = next(csv.reader(f), [])
+        if 'date' in header: return
+        # 与旧版 _get_feedback_str 同口径读取：固定列名，混入的表头行当作数据剔除
+        legacy = pd.read_csv(src, names=['code', 'name', 'score', 'price'], header=None, dtype=str, on_bad_lines='skip')
+        legacy = legacy[legacy['code'] != 'code'].dropna(subset=['code', 'price']).drop_duplicates(subset=['code', 'price'])
+
+        file_exists = os.path.exists(dst)
+        if file_exists:
+            with open(dst, encoding='utf-8') as f: fieldnames = next(csv.reader(f))
+        else: fieldnames = HIST_BASE_FIELDS + list(ALLSTOCK_WEIGHTS)
+        with open(dst, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            if not file_exists: writer.writeheader()
+            for _, r in legacy.iterrows():
+                # 旧记录没有日期和因子，只保留代码/名称/价格，回填时跳过
+                writer.writerow({'date': '', 'code': r['code'], 'name': r['name'], 'buy_price': r['price'],
+                                 'next_day_price': 0, 'price_t3': 0, 'price_t5': 0})
+        os.replace(src, src.replace('.csv', '_legacy.csv'))
+        print(f"📦 旧版选股记录 {len(legacy)} 条已迁入 {dst}")
+    except Exception as e:
+        print(f"⚠️ 旧版选股记录迁移跳过: {e}")
+
+
+class MultiStrategyEngine:
+    """
+    单次扫描引擎：行情、日线、因子只取一次，同一轮内为所有已注册策略打分，
+    各策略独立进化权重、排序并写入各自的历史记录
+    guard: 可选的运行调度器 (run_scheduler.RunScheduler)，用于按时间预算降级
+    """
+    def __init__(self, profiles=None):
+        self.llm = FreeLLMClient()
+        self.profiles = profiles if profiles else PROFILES
+        self.hot_sectors, self.market_status = [], ""
+        self.market_decision, self.stop_flag = "", False
+        self._expert_cache = {}
+        self._hist_cache = {}
+        self.guard = None
+        self.rollup = PerformanceRollup()
+        migrate_legacy_history()
+
+    # --- 1. 大盘环境 ---
+    def analyze_market(self, use_llm=True):
+        """use_llm=False 时跳过 LLM 热点分析用默认值，大盘风控 (仅用行情数据) 照常执行"""
+        if use_llm:
+            print("⏳ 正在探测今日市场环境 (技术指标+RAG)...")
+            self.hot_sectors, self.market_status = self.llm.fetch_market_analysis()
+        else: self.hot_sectors, self.market_status = fallback_market("时间不足")
+        self.market_decision, self.stop_flag = self.check_market_risk()
+
+    def check_market_risk(self):
+        """分析上证指数(sh000001)近30个交易日走势，给出买入建议"""
+        print(f"📊 正在深度分析大盘基本面趋势 (近30个交易日)...")
+        try:
+            df_index = ak.stock_zh_index_daily(symbol="sh000001")
+            if df_index.empty: return "未知", False
+
+            df_index['ma20'] = df_index['close'].rolling(20).mean()
+            recent_30 = df_index.tail(30).copy()
+
+            curr_p = recent_30['close'].iloc[-1]
+            ma20_now = recent_30['ma20'].iloc[-1]
+            ma20_prev = recent_30['ma20'].iloc[-5] # 5天前
+
+            # 趋势判定：价格在20日线下且20日线向下
+            is_downward = ma20_now < ma20_prev
+            is_below_ma = curr_p < ma20_now
+            period_ret = (curr_p / recent_30['close'].iloc[0] - 1) * 100
+
+            print(f"   >>> 当前指数: {curr_p:.2f} | 20日均线: {ma20_now:.2f}")
+            print(f"   >>> 近30日涨跌幅: {period_ret:.2f}% | 区间波幅: {((recent_30['high'].max()/recent_30['low'].min()-1)*100):.2f}%")
+
+            decision = "🚀 可以买入 (趋势向好或处于反弹区间)"
+            is_stop = False
+
+            if is_below_ma and is_downward:
+                decision = "⛔ 停止买入 (中期趋势走弱，建议空仓)"
+                is_stop = True
+            elif period_ret < -5:
+                decision = "⚠️ 停止买入 (短期超跌严重，风险未释放)"
+                is_stop = True
+
+            print(f"📢 大盘风控决策：【 {decision} 】")
+            return decision, is_stop
+        except: return "可以买入", False
+
+    # --- 2. 历史回填 ---
+    def _fetch_hist(self, code, start_dt, end_dt):
+        """同一只股票同一区间只请求一次（多个策略历史可能重叠）"""
+        key = (code, start_dt)
+        if key not in self._hist_cache:
+            self._hist_cache[key] = ak.stock_zh_a_hist(symbol=code, period="daily", start_date=start_dt, end_date=end_dt, adjust="qfq")
+        return self._hist_cache[key]
+
+    def update_historical_prices(self, profile, should_stop=None):
+        """
+        深度回测：不仅看次日，还追踪 T+3, T+5 表现
+        should_stop: 返回 True 时提前结束，已回填的部分照常保存
+        """
+        if not os.path.exists(profile.hist_path): return
+        try:
+            df = pd.read_csv(profile.hist_path, on_bad_lines='skip')
+            updated = False
+            today = datetime.now()
+
+            # 确保有 T+3, T+5 列
+            if 'price_t3' not in df.columns: df['price_t3'] = 0.0
+            if 'price_t5' not in df.columns: df['price_t5'] = 0.0
+
+            print(f"⏳ [{profile.name}] 正在深度回溯历史选股表现 (追踪 T+1~T+5 走势)...")
+
+            for index, row in df.iterrows():
+                # 只处理尚未填满数据的旧记录
+                if row['next_day_price'] == 0 or row['price_t3'] == 0 or row['price_t5'] == 0:
+                    if should_stop and should_stop(): break
+                    if pd.isna(row['date']): continue # 旧版迁入的记录无日期
+                    record_date = datetime.strptime(row['date'], "%Y-%m-%d")
+                    if (today - record_date).days <= 1: continue # 至少过了一天
+
+                    code = str(row['code']).zfill(6)
+                    try:
+                        # 获取区间日线
+                        stock_df = self._fetch_hist(code, record_date.strftime("%Y%m%d"), today.strftime("%Y%m%d"))
+                        for col, offset in (('next_day_price', 1), ('price_t3', 3), ('price_t5', 5)):
+                            if len(stock_df) > offset and row[col] == 0:
+                                price = stock_df.iloc[offset]['收盘']
+                                df.at[index, col] = price
+                                updated = True
+                                # 增量计入业绩汇总表
+                                ret = (price - row['buy_price']) / row['buy_price'] * 100
+                                self.rollup.record_outcome(profile.name, row['date'], code, row['name'], HORIZON_COLUMNS[col], ret,
+                                                           {k: row.get(k) for k in profile.factors})
+                    except: pass
+
+            if updated:
+                df.to_csv(profile.hist_path, index=False)
+                print(f"✅ [{profile.name}] 历史波段数据更新完毕。")
+
+        except Exception as e:
+            print(f"⚠️ [{profile.name}] 历史回测跳过: {e}")
+
+    # --- 3. 权重进化 ---
+    def evolve_weights(self, profile):
+        """
+        深度进化：基于多周期表现优化该策略的权重
+        """
+        try:
+            history_rows = []
+            if os.path.exists(profile.hist_path):
+                df = pd.read_csv(profile.hist_path, on_bad_lines='skip')
+                # 筛选出至少 T+1 有价格的记录
+                valid_df = df[df['next_day_price'] > 0].tail(EVOLUTION_LOOKBACK)
+
+                for _, row in valid_df.iterrows():
+                    # 计算多周期收益
+                    buy = row['buy_price']
+                    ret1 = (row['next_day_price'] - buy) / buy * 100
+                    p3 = row.get('price_t3', 0)
+                    ret3 = (p3 - buy) / buy * 100 if p3 > 0 else 0
+
+                    # 结果标签：不仅看涨跌，还看是否是大牛股(T+3 > 15%)
+                    label = "大妖股🚀" if ret3 > 15 else ("波段涨" if ret3 > 5 else ("一日游" if ret1 > 0 and ret3 < 0 else "亏损"))
+
+                    history_rows.append({'名称': row['name'], '结果': label, 'T+1%': ret1, 'T+3%': ret3,
+                                         **{k: row.get(k, 0) for k in profile.factors}})
+
+
+            market_ctx = f"热点:{self.hot_sectors}, 状态:{self.market_status}"
+            print(f"🧠 [{profile.name}] DeepSeek 正在进行【Transformer自注意力进化】...")
+            print(f"   >>> 目标: 识别能穿越 T+1 到 T+{TARGET_HORIZON} 的波段因子")
+
+            # 紧凑表格编码，超预算时优先保留 |T+3| 最显著的样本，其余汇总
+            new_weights = self.llm.optimize_weights_deep_evolution(
+                history_rows, ['名称', '结果', 'T+1%', 'T+3%'] + profile.factors, profile.default_weights, market_ctx,
+                priority=lambda r: abs(r['T+3%']))
+            if new_weights:
+                profile.weights = new_weights
+                save_cached_weights(profile)
+            else:
+                # LLM 失败/超时：沿用上次成功进化的权重，不覆盖缓存
+                print(f"⚠️ [{profile.name}] 权重进化失败，使用缓存/默认权重")
+                profile.weights = load_cached_weights(profile)
+
+        except Exception as e:
+            print(f"⚠️ [{profile.name}] 权重优化降级: {e}")
+            profile.weights = load_cached_weights(profile)
+
+    # --- 4. 单次扫描 ---
+    def _expert_score(self, code, row):
+        """逐股 LLM 专家打分，多个策略共用同一结果；超出预算后靠后的个股直接给默认分"""
+        if code not in self._expert_cache:
+            if self.guard and not self.guard.allow("expert_scoring", "跳过低排名个股的 LLM 专家打分", need=5):
+                return 60, "量化趋势稳健 (未经LLM打分)", 0
+            start = time.time()
+            self._expert_cache[code] = self.llm.get_ai_expert_factor(row)
+            if self.guard: self.guard.charge("expert_scoring", time.time() - start)
+        return self._expert_cache[code]
+
+    def scan(self):
+        """
+        行情只拉一次，各策略股票池取并集，每只股票日线/因子只算一次，
+        再按各策略自己的因子和权重打分
+        """
+        print("🔍 正在扫描全市场 (各策略共享行情与因子)...")
+        try:
+            pool = ak.stock_zh_a_spot_em()
+        except: return {p.name: [] for p in self.profiles}
+
+        members = {p.name: set(p.universe(pool)['代码']) for p in self.profiles}
+        universe = pd.concat([p.universe(pool) for p in self.profiles]).drop_duplicates(subset='代码')
+        if self.guard: universe = self.guard.shrink_universe(universe)
+        candidates = {p.name: [] for p in self.profiles}
+
+        for _, row in universe.iterrows():
+            if self.guard and not self.guard.allow("scan", "扫描超时，剩余个股不再计算"): break
+            code = str(row['代码']).zfill(6)
+            active = [p for p in self.profiles if row['代码'] in members[p.name]
+                      and not (p.max_candidates and len(candidates[p.name]) >= p.max_candidates)]
+            if not active: continue
+
+            tsg = TradingSignalGenerator(code)
+            tsg.fetch_stock_data()
+            base = tsg.get_indicators()
+            if not base: continue
+            factors = {**base, **(tsg.get_extended_indicators(row['名称'], self.hot_sectors) or {})}
+            prices = tsg.calculate_logic()
+            if not prices: continue
+
+            for p in active:
+                f = {k: factors.get(k, 0) for k in p.factors}
+                alpha, reason = 0, ""
+                if p.expert_key:
+                    f[p.expert_key], reason, alpha = self._expert_score(code, row)
+
+                candidates[p.name].append({
+                    'code': code, 'name': row['名称'], 'final_score': round(p.score(f) + alpha, 1),
+                    'ai_reason': reason, 'position_pct': factors.get('position_pct'), **f, **prices
+                })
+        return candidates
+
+    # --- 5. 排序、输出、落盘 ---
+    def report(self, profile, ranked):
+        print("\n" + "🥇" * 15 + f" [{profile.name}] {profile.title} " + "🥇" * 15)
+        if self.stop_flag:
+            print(f"🚨 风险提示：当前大盘判定为【 {self.market_decision} 】，选股结果仅供观察，实盘请务必谨慎或空仓！")
+        for i, s in enumerate(ranked):
+            print(f"{i+1}. {s['code']} | {s['name']} | 🏆 总分: {s['final_score']}")
+            print("   [因子] " + " ".join(f"{k}:{s[k]}" for k in profile.weights if k in s))
+            if s.get('ai_reason'): print(f"   >>> 💡 AI: {s['ai_reason']}")
+            print(f"   >>> 💰 当日委托买入: {s['entrust_buy']} | 📈 T+1委托卖出: {s['entrust_sell_t1']}")
+            print(f"   >>> 🛡️ 止损参考: {s['stop_loss']}")
+            print("-" * 80)
+
+    def log_history(self, profile, ranked):
+        file_exists = os.path.exists(profile.hist_path)
+        # 记录时预留 T+3, T+5 列
+        fieldnames = HIST_BASE_FIELDS + list(profile.weights)
+
+        with open(profile.hist_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            if not file_exists: writer.writeheader()
+            for s in ranked:
+                row = {
+                    'date': datetime.now().strftime("%Y-%m-%d"),
+                    'code': s['code'], 'name': s['name'], 'buy_price': s['price'],
+                    'next_day_price': 0, 'price_t3': 0, 'price_t5': 0 # 初始占位
+                }
+                for k in profile.weights: row[k] = s.get(k, 0)
+                writer.writerow(row)
+        self.rollup.record_selection(profile.name, datetime.now().strftime("%Y-%m-%d"), ranked)
+
+    def run(self):
+        print(f"\n🚀 [AI 多策略选股引擎] 启动：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self.analyze_market()
+        print(f"📡 大盘操作建议: {self.market_status} | 核心热点: {self.hot_sectors}")
+
+        for p in self.profiles:
+            self.update_historical_prices(p)
+            self.evolve_weights(p)
+            print(f"⚖️  [{p.name}] DeepSeek 进化权重: {p.weights}")
+
+        candidates = self.scan()
+        results = {}
+        for p in self.profiles:
+            ranked = p.ranker(self, p, candidates[p.name])
+            self.report(p, ranked)
+            self.log_history(p, ranked)
+            results[p.name] = ranked
+        build_signals(results, order=[p.name for p in PROFILES])
+        return results
+
+
+if __name__ == "__main__":
+    MultiStrategyEngine().run()
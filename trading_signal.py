@@ -1,7 +1,20 @@
 import pandas as pd
 import akshare as ak
 import numpy as np
+import os, json, functools
 from datetime import datetime, timedelta
+from config import EXIT_PARAMS, EXIT_PARAMS_PATH
+
+@functools.lru_cache(maxsize=1)
+def load_exit_params():
+    """默认止盈止损参数，叠加 exit_sweep.py 回写的优选参数 (每个进程只读一次)"""
+    params = dict(EXIT_PARAMS)
+    if os.path.exists(EXIT_PARAMS_PATH):
+        try:
+            with open(EXIT_PARAMS_PATH, encoding='utf-8') as f:
+                params.update({k: float(v) for k, v in json.load(f).items() if k in EXIT_PARAMS})
+        except (OSError, ValueError): pass
+    return params
 
 class TradingSignalGenerator:
     def __init__(self, stock_code: str):
@@ -46,29 +59,64 @@ class TradingSignalGenerator:
 
         return {"量价爆发": round(f1, 1), "趋势强度": round(f2, 1), "资金流向": round(f3, 1), "基本面安全垫": f4}
 
-    def calculate_logic(self, weights=None):
+    def get_extended_indicators(self, name="", hot_keywords=None):
+        """
+        全市场策略因子（趋势/动能/成交/弹性/专家），沿用 allstock.zip 归档版 get_indicators 的口径，
+        与 get_indicators 共用同一份日线
+        """
+        if self.stock_data is None or len(self.stock_data) < 60: return None
+        df = self.stock_data
+        curr = df['收盘'].iloc[-1]
+        
+        # 1. 趋势得分 (MA20, MA60)
+        ma20 = df['收盘'].rolling(20).mean().iloc[-1]
+        ma60 = df['收盘'].rolling(60).mean().iloc[-1]
+        trend = 100 if curr > ma20 and curr > ma60 else (50 if curr > ma20 else 10)
+        
+        # 2. 动能得分 (近20日涨跌)
+        momentum = (curr / df['收盘'].iloc[-20] - 1) * 100
+        
+        # 3. 成交量得分 (量比)
+        vol_ratio = df['成交量'].iloc[-1] / df['成交量'].tail(10).mean()
+        
+        # 4. 弹性 (波动率)
+        amplitude = ((df['最高'] - df['最低']) / df['收盘'].shift(1)).tail(5).mean() * 100
+        
+        # 5. 专家分 (关键词匹配)
+        expert = 100 if any(k in str(name) for k in (hot_keywords or [])) else 0
+
+        # 位阶：供终极决策参考
+        low, high = df['最低'].min(), df['最高'].max()
+        position_pct = round((curr - low) / (high - low) * 100, 1) if high != low else 50
+        
+        return {
+            "趋势": trend, 
+            "动能": round(max(0, momentum * 5), 1), 
+            "成交": round(vol_ratio * 15, 1), 
+            "弹性": round(amplitude * 10, 1), 
+            "专家": expert,
+            "position_pct": position_pct
+        }
+
+    def calculate_logic(self):
         """
-        参数 weights: 当前 AI 进化的权重字典，用于动态调整止盈策略
+        委托买入/止盈/止损价位，倍数取 load_exit_params() (exit_sweep.py 回测优选后回写)
         """
         if self.stock_data is None or self.stock_data.empty: return None
         df = self.stock_data
         price = df['收盘'].iloc[-1]
         atr = (df['最高'] - df['最低']).tail(14).mean()
         
+        p = load_exit_params()
+
         # 委托买入价
         ma5 = df['收盘'].rolling(5).mean().iloc[-1]
-        entrust_buy = round(max(price * 0.99, ma5), 2)
-        
-        # --- 动态止盈逻辑 ---
-        # 默认 T+1 止盈是 1.2倍 ATR
-        profit_ratio = 1.2
-        
-        # 如果 AI 认为现在适合“量价爆发”（权重>35），说明是进攻行情，格局放大，看 T+3
-        if weights and weights.get("量价爆发", 0) > 35:
-            profit_ratio = 2.0 # 目标位拉高到 2.0 ATR (博弈连板)
+        entrust_buy = round(max(price * p["entry_ratio"], ma5), 2)
         
-        t1_sell_target = round(price + profit_ratio * atr, 2)
-        stop_loss = round(min(price - 0.8 * atr, df['最低'].iloc[-1] * 0.98), 2)
+        # T+1 止盈是 target_atr 倍 ATR
+        # (不再按 量价爆发 权重切换进攻倍数：历史记录不含当时权重，回测无法验证该倍数)
+        t1_sell_target = round(price + p["target_atr"] * atr, 2)
+        stop_loss = round(min(price - p["stop_atr"] * atr, df['最低'].iloc[-1] * p["stop_low_ratio"]), 2)
         
         return {
             'price': price,
@@ -76,5 +124,7 @@ class TradingSignalGenerator:
             'entrust_sell_t1': t1_sell_target,
             'target': t1_sell_target,
             'stop_loss': stop_loss,
-            'atr': round(atr, 2)
+            'atr': round(atr, 2),
+            'support': round(df['最低'].tail(10).min(), 2),
+            'resistance': round(df['最高'].tail(10).max(), 2)
         }
\ No newline at end of file